@@ -1,66 +1,157 @@
 import PyPDF2
+import contextlib
+import hashlib
+import io
+import json
 import os
+import pymupdf as fitz
 import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-def split_by_headers(input_path, output_dir):
-    with open(input_path, 'rb') as file:
-        pdf_reader = PyPDF2.PdfReader(file)
-        total_pages = len(pdf_reader.pages)
-        delimiter_positions = []
-        prev_first_line = None
-        delimiter_positions.append(0)
-        for page_num in range(total_pages - 1):
-            page = pdf_reader.pages[page_num]
-            text = page.extract_text()
-            if page_num == 347:
-                delimiter_positions.append(page_num)
-            if text:
-                first_line = text.split('\n')[0] if '\n' in text else text
-                if re.search(r'^\d+$', first_line.strip()) or re.search(r'^Chapter\s+\d+\.', first_line.strip()):
-                    delimiter_positions.append(page_num)
-            if text:
-                lines = text.split("\n")
-                for line in lines:
-                    if re.search(r'\d+\s+-\s+', line):
-                        delimiter_positions.append(page_num)
-        if total_pages > 0:
-            delimiter_positions.append(total_pages)
-        delimiter_positions = sorted(set(delimiter_positions))
+NUM_WORKERS = min(os.cpu_count() or 1, 4)
+MIN_OUTLINE_CHAPTERS = 3
+FORCED_DELIMITER = 347
+SCAN_CHUNK_SIZE = 16
+WRITE_BUFFER_SIZE = 1 << 20
+PROGRESS_BATCH = 10
+CACHE_DIR = Path.home() / '.cache' / 'isplit_pdf'
+# Bump when the detection rules change in ways the key below doesn't capture.
+DETECTION_VERSION = 1
+CHAPTER_RE = re.compile(r'Chapter\s+\d+\.')
+SECTION_RE = re.compile(r'\d+[^\S\n]+-[^\S\n]+')
+
+_document = None
+
+def _open_document(input_path):
+    global _document
+    _document = fitz.open(input_path)
+
+def _is_delimiter_page(page_num):
+    if page_num == FORCED_DELIMITER:
+        return True
+    text = _document.load_page(page_num).get_text()
+    if not text:
+        return False
+    first_line = text.split('\n', 1)[0].strip()
+    return bool(first_line.isdecimal()
+                or first_line.startswith('Chapter') and CHAPTER_RE.match(first_line)
+                or '-' in text and SECTION_RE.search(text))
+
+def _outline_delimiters(doc):
+    return sorted({page - 1 for level, _, page in doc.get_toc()
+                   if level == 1 and 0 < page <= doc.page_count})
+
+def _read_pdf(input_path, pdf_data):
+    return Path(input_path).read_bytes() if pdf_data is None else pdf_data
+
+def _cache_key(pdf_data, use_outline):
+    params = json.dumps([DETECTION_VERSION, fitz.VersionBind, FORCED_DELIMITER, MIN_OUTLINE_CHAPTERS,
+                         CHAPTER_RE.pattern, SECTION_RE.pattern, use_outline])
+    return hashlib.sha256(f"{hashlib.sha256(pdf_data).hexdigest()}:{params}".encode()).hexdigest()
+
+def _valid_delimiters(positions):
+    return (isinstance(positions, list) and positions[:1] == [0]
+            and all(type(page) is int for page in positions)
+            and all(a < b for a, b in zip(positions, positions[1:])))
+
+def split_by_headers(input_path, output_dir, num_workers=NUM_WORKERS, use_outline=False, refresh=False,
+                     pdf_data=None):
+    pdf_data = _read_pdf(input_path, pdf_data)
+    cache_path = CACHE_DIR / f"{_cache_key(pdf_data, use_outline)}.json"
+    if not refresh:
+        try:
+            delimiter_positions = json.loads(cache_path.read_text())
+        except (OSError, ValueError):
+            delimiter_positions = None
+        if _valid_delimiters(delimiter_positions):
+            return delimiter_positions
+    delimiter_positions = _find_delimiters(input_path, pdf_data, num_workers, use_outline)
+    _write_cache(cache_path, delimiter_positions)
     return delimiter_positions
 
-def main():
+def _write_cache(cache_path, delimiter_positions):
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix='.tmp')
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, 'w') as tmp_file:
+            json.dump(delimiter_positions, tmp_file)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+
+def _find_delimiters(input_path, pdf_data, num_workers, use_outline):
+    with fitz.open(stream=pdf_data, filetype='pdf') as doc:
+        total_pages = doc.page_count
+        outline_positions = _outline_delimiters(doc) if use_outline else []
+    scan_range = range(1, total_pages - 1)
+    if len(outline_positions) >= MIN_OUTLINE_CHAPTERS:
+        forced_positions = [FORCED_DELIMITER] if FORCED_DELIMITER in scan_range else []
+        return sorted({0, *outline_positions, *forced_positions, total_pages})
+    delimiter_positions = [0]
+    # Scan workers are separate processes, so each one reopens the file by path.
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_open_document,
+                             initargs=(input_path,)) as executor:
+        flags = executor.map(_is_delimiter_page, scan_range, chunksize=SCAN_CHUNK_SIZE)
+        delimiter_positions.extend(page_num for page_num, is_delimiter in zip(scan_range, flags)
+                                   if is_delimiter)
+    if total_pages > 0:
+        delimiter_positions.append(total_pages)
+    return delimiter_positions
+
+def _write_chapter(pdf_reader, output_dir, chapter_num, start_page, end_page):
+    pdf_writer = PyPDF2.PdfWriter()
+    pdf_writer.append(pdf_reader, pages=(start_page, end_page), import_outline=False)
+    output_filename = f"chapter_{chapter_num:03d}_pages_{start_page+1:03d}_to_{end_page:03d}.pdf"
+    with open(output_dir / output_filename, 'wb', buffering=WRITE_BUFFER_SIZE) as output_file:
+        pdf_writer.write(output_file)
+    return output_filename
+
+def save_chapters(input_path, delimiter_positions, output_dir, pdf_data=None):
+    output_dir = Path(output_dir)
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(_read_pdf(input_path, pdf_data)))
+    chapter_bounds = zip(delimiter_positions, delimiter_positions[1:])
+    progress = []
+    for chapter_num, (start_page, end_page) in enumerate(chapter_bounds, 1):
+        output_filename = _write_chapter(pdf_reader, output_dir, chapter_num, start_page, end_page)
+        progress.append(f"✅ Created: {output_filename} (pages {start_page+1}-{end_page})")
+        if len(progress) == PROGRESS_BATCH:
+            print('\n'.join(progress))
+            progress.clear()
+    if progress:
+        print('\n'.join(progress))
+
+def main(refresh=False, use_outline=False):
     input_path = '/content/drive/MyDrive/input.pdf'
-    output_dir = '/content/drive/MyDrive/split_chapters'
+    output_dir = Path('/content/drive/MyDrive/split_chapters')
     if not os.path.exists(input_path):
         print(f"❌ Error: Input file not found at {input_path}")
         print("Please make sure your PDF is at: /content/drive/MyDrive/input.pdf")
         return
-    print("=" * 70)
-    print("📚 PDF CHAPTER SPLITTER")
-    print("=" * 70)
-    print(f"📂 Input file: {input_path}")
-    print(f"📂 Output directory: {output_dir}")
-    print("=" * 70)
-    os.makedirs(output_dir, exist_ok=True)
-    delimiter_positions = split_by_headers(input_path, output_dir)
-    with open(input_path, 'rb') as file:
-        pdf_reader = PyPDF2.PdfReader(file)
-        total_pages = len(pdf_reader.pages)
-        for i in range(len(delimiter_positions) - 1):
-            start_page = delimiter_positions[i]
-            end_page = delimiter_positions[i + 1]
-            pdf_writer = PyPDF2.PdfWriter()
-            for page_num in range(start_page, end_page):
-                pdf_writer.add_page(pdf_reader.pages[page_num])
-            output_filename = f"chapter_{i+1:03d}_pages_{start_page+1:03d}_to_{end_page:03d}.pdf"
-            output_path = os.path.join(output_dir, output_filename)
-            with open(output_path, 'wb') as output_file:
-                pdf_writer.write(output_file)
-            print(f"✅ Created: {output_filename} (pages {start_page+1}-{end_page})")
-    print("=" * 70)
-    print(f"🎉 Successfully split PDF into {len(delimiter_positions)-1} chapters!")
-    print("=" * 70)
+    print('\n'.join([
+        "=" * 70,
+        "📚 PDF CHAPTER SPLITTER",
+        "=" * 70,
+        f"📂 Input file: {input_path}",
+        f"📂 Output directory: {output_dir}",
+        "=" * 70,
+    ]))
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # Read once: the cache key, the outline and the chapter writer all share this buffer.
+    pdf_data = Path(input_path).read_bytes()
+    delimiter_positions = split_by_headers(input_path, output_dir, use_outline=use_outline,
+                                           refresh=refresh, pdf_data=pdf_data)
+    save_chapters(input_path, delimiter_positions, output_dir, pdf_data=pdf_data)
+    print('\n'.join([
+        "=" * 70,
+        f"🎉 Successfully split PDF into {len(delimiter_positions)-1} chapters!",
+        "=" * 70,
+    ]))
 
 if __name__ == "__main__":
     total_pages = 0